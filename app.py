@@ -19,6 +19,7 @@ logging.basicConfig(
     format="%(asctime)s %(levelname)s %(name)s: %(message)s",
     level=logging.INFO,
 )
+logging.getLogger("httpx").setLevel(logging.WARNING)
 logger = logging.getLogger(__name__)
 
 
@@ -28,7 +29,12 @@ def _build_runtime(settings: Settings) -> dict[str, object]:
     if not settings.database_url:
         raise RuntimeError("DATABASE_URL belum diisi.")
 
-    db = ExpenseDB(database_url=settings.database_url, timezone_name=settings.bot_timezone)
+    db = ExpenseDB(
+        database_url=settings.database_url,
+        timezone_name=settings.bot_timezone,
+        min_pool_size=settings.db_pool_min_size,
+        max_pool_size=max(settings.db_pool_min_size, settings.db_pool_max_size),
+    )
     db.open()
     db.ensure_schema()
 
@@ -37,6 +43,8 @@ def _build_runtime(settings: Settings) -> dict[str, object]:
         endpoint_url=settings.florence_endpoint_url,
         api_token=settings.huggingface_api_token,
         model_id=settings.florence_model_id,
+        max_concurrency=settings.ocr_concurrency,
+        fallback_model_id=settings.florence_fallback_model_id,
     )
     chart_service = ExpenseChartService(
         db=db,
@@ -79,6 +87,8 @@ async def lifespan(app: FastAPI):
     finally:
         await telegram_application.stop()
         await telegram_application.shutdown()
+        await app.state.receipt_ocr.aclose()
+        await app.state.chart_service.aclose()
         app.state.db.close()
 
 
@@ -93,6 +103,8 @@ async def root(request: Request) -> dict[str, object]:
         "service": "cuanbot-webhook",
         "webhook_url": settings.webhook_url,
         "florence_enabled": bool(settings.florence_endpoint_url),
+        "ocr_scans": request.app.state.receipt_ocr.scan_count,
+        "ocr_escalations": request.app.state.receipt_ocr.escalation_count,
     }
 
 
@@ -157,7 +169,7 @@ async def setup_webhook(request: Request) -> dict[str, object]:
     await telegram_application.bot.set_webhook(
         url=settings.webhook_url,
         secret_token=settings.telegram_webhook_secret or None,
-        allowed_updates=Update.ALL_TYPES,
+        allowed_updates=[Update.MESSAGE],
         drop_pending_updates=False,
     )
     info = await telegram_application.bot.get_webhook_info()
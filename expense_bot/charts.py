@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from datetime import datetime
+from typing import Optional
 from zoneinfo import ZoneInfo
 
 import httpx
@@ -31,10 +32,18 @@ class ExpenseChartService:
         self.db = db
         self.quickchart_url = quickchart_url
         self.tz = ZoneInfo(timezone_name)
+        self._client = httpx.AsyncClient(timeout=30.0)
 
-    async def render_monthly_category_chart(self, user_key: str) -> bytes:
+    async def aclose(self) -> None:
+        if self._client.is_closed:
+            return
+        await self._client.aclose()
+
+    async def render_monthly_category_chart(
+        self, user_key: str, now: Optional[datetime] = None
+    ) -> bytes:
         category_totals = self.db.category_totals_for_period(user_key, "month")
-        month_label = datetime.now(self.tz).strftime("%m/%Y")
+        month_label = (now or datetime.now(self.tz)).strftime("%m/%Y")
 
         if category_totals:
             labels = [category for category, _ in category_totals]
@@ -81,14 +90,13 @@ class ExpenseChartService:
             },
         }
 
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                self.quickchart_url,
-                json=payload,
-                headers={"Accept": "image/png"},
-            )
-            response.raise_for_status()
-            return response.content
+        response = await self._client.post(
+            self.quickchart_url,
+            json=payload,
+            headers={"Accept": "image/png"},
+        )
+        response.raise_for_status()
+        return response.content
 
-    def build_filename(self) -> str:
-        return f"grafik-pengeluaran-{datetime.now(self.tz).strftime('%Y-%m')}.png"
+    def build_filename(self, now: Optional[datetime] = None) -> str:
+        return f"grafik-pengeluaran-{(now or datetime.now(self.tz)).strftime('%Y-%m')}.png"
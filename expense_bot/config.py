@@ -21,9 +21,13 @@ class Settings:
     florence_endpoint_url: str
     huggingface_api_token: str
     florence_model_id: str
+    florence_fallback_model_id: str
+    ocr_concurrency: int
     quickchart_url: str
     port: int
     allowed_telegram_users: list[int]
+    db_pool_min_size: int
+    db_pool_max_size: int
 
     @property
     def resolved_public_base_url(self) -> str:
@@ -56,9 +60,13 @@ def get_settings() -> Settings:
         florence_endpoint_url=os.getenv("FLORENCE_ENDPOINT_URL", "").strip(),
         huggingface_api_token=os.getenv("HUGGINGFACE_API_TOKEN", "").strip(),
         florence_model_id=os.getenv("FLORENCE_MODEL_ID", "microsoft/Florence-2-base").strip(),
+        florence_fallback_model_id=os.getenv("FLORENCE_FALLBACK_MODEL_ID", "").strip(),
+        ocr_concurrency=int(os.getenv("OCR_CONCURRENCY", "4")),
         quickchart_url=os.getenv("QUICKCHART_URL", "https://quickchart.io/chart").strip(),
         port=int(os.getenv("PORT", "8000")),
         allowed_telegram_users=_parse_allowed_users(os.getenv("ALLOWED_TELEGRAM_USERS", "")),
+        db_pool_min_size=int(os.getenv("DB_POOL_MIN_SIZE", "1")),
+        db_pool_max_size=int(os.getenv("DB_POOL_MAX_SIZE", "5")),
     )
 
 
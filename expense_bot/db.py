@@ -1,11 +1,12 @@
 from __future__ import annotations
 
+import time
 from dataclasses import dataclass
 from datetime import date, datetime
 from typing import Any, Optional
 from zoneinfo import ZoneInfo
 
-from psycopg.rows import dict_row
+from psycopg.rows import class_row, dict_row, tuple_row
 from psycopg.types.json import Jsonb
 from psycopg_pool import ConnectionPool
 
@@ -21,7 +22,7 @@ class ExpenseRecord:
     created_at: datetime
 
 
-@dataclass
+@dataclass(slots=True)
 class PendingReceipt:
     user_key: str
     item: str
@@ -38,6 +39,8 @@ class ExpenseDB:
         "week": "expense_date BETWEEN date_trunc('week', CURRENT_DATE)::date AND CURRENT_DATE",
         "month": "expense_date BETWEEN date_trunc('month', CURRENT_DATE)::date AND CURRENT_DATE",
     }
+    DEFAULT_WEEKLY_BUDGET = 2100000
+    BUDGET_CACHE_TTL_SECONDS = 300.0
 
     def __init__(
         self,
@@ -59,9 +62,19 @@ class ExpenseDB:
             configure=self._configure_connection,
         )
         self._opened = False
+        self._weekly_budget_cache: dict[str, tuple[float, int]] = {}
+        self._category_budget_cache: dict[tuple[str, str], tuple[float, Optional[int]]] = {}
 
     def _configure_connection(self, conn) -> None:
-        conn.execute("SELECT set_config('TimeZone', %s, false)", (self.timezone_name,))
+        # Session-level settings, applied once per pooled connection in a single round trip.
+        conn.execute(
+            """
+            SELECT
+                set_config('TimeZone', %s, false),
+                set_config('lock_timeout', '5s', false)
+            """,
+            (self.timezone_name,),
+        )
 
     def open(self) -> None:
         if self._opened:
@@ -97,6 +110,19 @@ class ExpenseDB:
                 ON expenses (user_key, expense_date DESC, created_at DESC)
                 """
             )
+            conn.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_expenses_user_date_covering
+                ON expenses (user_key, expense_date)
+                INCLUDE (category, amount)
+                """
+            )
+            conn.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_expenses_user_created
+                ON expenses (user_key, created_at DESC)
+                """
+            )
             conn.execute(
                 """
                 CREATE TABLE IF NOT EXISTS user_settings (
@@ -161,77 +187,79 @@ class ExpenseDB:
 
     def list_recent(self, user_key: str, limit: int = 10) -> list[ExpenseRecord]:
         with self.pool.connection() as conn:
-            rows = conn.execute(
-                """
-                SELECT id, user_key, item, amount, category, expense_date, created_at
-                FROM expenses
-                WHERE user_key = %s
-                ORDER BY created_at DESC
-                LIMIT %s
-                """,
-                (user_key, limit),
-            ).fetchall()
-        return [self._row_to_expense(row) for row in rows]
+            with conn.cursor(row_factory=class_row(ExpenseRecord)) as cur:
+                return cur.execute(
+                    """
+                    SELECT id, user_key, item, amount, category, expense_date, created_at
+                    FROM expenses
+                    WHERE user_key = %s
+                    ORDER BY created_at DESC
+                    LIMIT %s
+                    """,
+                    (user_key, limit),
+                ).fetchall()
 
     def list_for_period(self, user_key: str, period: str) -> list[ExpenseRecord]:
         filter_sql = self.PERIOD_FILTERS[period]
         with self.pool.connection() as conn:
-            rows = conn.execute(
-                f"""
-                SELECT id, user_key, item, amount, category, expense_date, created_at
-                FROM expenses
-                WHERE user_key = %s
-                  AND {filter_sql}
-                ORDER BY expense_date DESC, created_at DESC
-                """,
-                (user_key,),
-            ).fetchall()
-        return [self._row_to_expense(row) for row in rows]
+            with conn.cursor(row_factory=class_row(ExpenseRecord)) as cur:
+                return cur.execute(
+                    f"""
+                    SELECT id, user_key, item, amount, category, expense_date, created_at
+                    FROM expenses
+                    WHERE user_key = %s
+                      AND {filter_sql}
+                    ORDER BY expense_date DESC, created_at DESC
+                    """,
+                    (user_key,),
+                ).fetchall()
 
     def total_for_period(self, user_key: str, period: str) -> int:
         filter_sql = self.PERIOD_FILTERS[period]
-        with self.pool.connection() as conn:
-            row = conn.execute(
-                f"""
-                SELECT COALESCE(SUM(amount), 0) AS total
-                FROM expenses
-                WHERE user_key = %s
-                  AND {filter_sql}
-                """,
-                (user_key,),
-            ).fetchone()
-        return int(row["total"]) if row else 0
+        return self._scalar(
+            f"""
+            SELECT COALESCE(SUM(amount), 0)::bigint
+            FROM expenses
+            WHERE user_key = %s
+              AND {filter_sql}
+            """,
+            (user_key,),
+        )
 
-    def total_by_category_for_period(self, user_key: str, period: str, category: str) -> int:
+    def totals_with_category_for_period(
+        self, user_key: str, period: str, category: str
+    ) -> tuple[int, int]:
         filter_sql = self.PERIOD_FILTERS[period]
         with self.pool.connection() as conn:
-            row = conn.execute(
-                f"""
-                SELECT COALESCE(SUM(amount), 0) AS total
-                FROM expenses
-                WHERE user_key = %s
-                  AND category = %s
-                  AND {filter_sql}
-                """,
-                (user_key, category),
-            ).fetchone()
-        return int(row["total"]) if row else 0
+            with conn.cursor(row_factory=tuple_row) as cur:
+                row = cur.execute(
+                    f"""
+                    SELECT
+                        COALESCE(SUM(amount), 0)::bigint,
+                        COALESCE(SUM(amount) FILTER (WHERE category = %s), 0)::bigint
+                    FROM expenses
+                    WHERE user_key = %s
+                      AND {filter_sql}
+                    """,
+                    (category, user_key),
+                ).fetchone()
+        return (row[0], row[1]) if row else (0, 0)
 
     def category_totals_for_period(self, user_key: str, period: str) -> list[tuple[str, int]]:
         filter_sql = self.PERIOD_FILTERS[period]
         with self.pool.connection() as conn:
-            rows = conn.execute(
-                f"""
-                SELECT category, COALESCE(SUM(amount), 0) AS total
-                FROM expenses
-                WHERE user_key = %s
-                  AND {filter_sql}
-                GROUP BY category
-                ORDER BY total DESC, category ASC
-                """,
-                (user_key,),
-            ).fetchall()
-        return [(str(row["category"]), int(row["total"])) for row in rows]
+            with conn.cursor(row_factory=tuple_row) as cur:
+                return cur.execute(
+                    f"""
+                    SELECT category, COALESCE(SUM(amount), 0)::bigint AS total
+                    FROM expenses
+                    WHERE user_key = %s
+                      AND {filter_sql}
+                    GROUP BY category
+                    ORDER BY total DESC, category ASC
+                    """,
+                    (user_key,),
+                ).fetchall()
 
     def delete_by_id(self, user_key: str, expense_id: int) -> bool:
         with self.pool.connection() as conn:
@@ -243,26 +271,37 @@ class ExpenseDB:
 
     def clear_user(self, user_key: str) -> int:
         with self.pool.connection() as conn:
-            deleted = conn.execute("DELETE FROM expenses WHERE user_key = %s", (user_key,))
-            conn.execute("DELETE FROM category_budgets WHERE user_key = %s", (user_key,))
-            conn.execute("DELETE FROM pending_receipts WHERE user_key = %s", (user_key,))
+            # Pool connections are autocommit: the three deletes are atomic only as one statement.
+            deleted = conn.execute(
+                """
+                WITH cleared_budgets AS (
+                    DELETE FROM category_budgets WHERE user_key = %(user_key)s
+                ),
+                cleared_receipts AS (
+                    DELETE FROM pending_receipts WHERE user_key = %(user_key)s
+                )
+                DELETE FROM expenses WHERE user_key = %(user_key)s
+                """,
+                {"user_key": user_key},
+            )
+        self._category_budget_cache = {
+            key: entry for key, entry in self._category_budget_cache.items() if key[0] != user_key
+        }
         return int(deleted.rowcount)
 
     def get_weekly_budget(self, user_key: str) -> int:
+        cached = self._weekly_budget_cache.get(user_key)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+
         with self.pool.connection() as conn:
-            conn.execute(
-                """
-                INSERT INTO user_settings (user_key, weekly_budget)
-                VALUES (%s, 2100000)
-                ON CONFLICT(user_key) DO NOTHING
-                """,
-                (user_key,),
-            )
             row = conn.execute(
                 "SELECT weekly_budget FROM user_settings WHERE user_key = %s",
                 (user_key,),
             ).fetchone()
-        return int(row["weekly_budget"]) if row else 2100000
+        weekly_budget = int(row["weekly_budget"]) if row else self.DEFAULT_WEEKLY_BUDGET
+        self._weekly_budget_cache[user_key] = (self._cache_expiry(), weekly_budget)
+        return weekly_budget
 
     def set_weekly_budget(self, user_key: str, amount: int) -> None:
         with self.pool.connection() as conn:
@@ -275,6 +314,7 @@ class ExpenseDB:
                 """,
                 (user_key, amount),
             )
+        self._weekly_budget_cache[user_key] = (self._cache_expiry(), amount)
 
     def set_category_budget(self, user_key: str, category: str, limit_amount: int) -> None:
         with self.pool.connection() as conn:
@@ -287,8 +327,13 @@ class ExpenseDB:
                 """,
                 (user_key, category, limit_amount),
             )
+        self._category_budget_cache[(user_key, category)] = (self._cache_expiry(), limit_amount)
 
     def get_category_budget(self, user_key: str, category: str) -> Optional[int]:
+        cached = self._category_budget_cache.get((user_key, category))
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+
         with self.pool.connection() as conn:
             row = conn.execute(
                 """
@@ -298,22 +343,22 @@ class ExpenseDB:
                 """,
                 (user_key, category),
             ).fetchone()
-        if not row:
-            return None
-        return int(row["limit_amount"])
+        limit_amount = int(row["limit_amount"]) if row else None
+        self._category_budget_cache[(user_key, category)] = (self._cache_expiry(), limit_amount)
+        return limit_amount
 
     def list_category_budgets(self, user_key: str) -> list[tuple[str, int]]:
         with self.pool.connection() as conn:
-            rows = conn.execute(
-                """
-                SELECT category, limit_amount
-                FROM category_budgets
-                WHERE user_key = %s
-                ORDER BY category ASC
-                """,
-                (user_key,),
-            ).fetchall()
-        return [(str(row["category"]), int(row["limit_amount"])) for row in rows]
+            with conn.cursor(row_factory=tuple_row) as cur:
+                return cur.execute(
+                    """
+                    SELECT category, limit_amount
+                    FROM category_budgets
+                    WHERE user_key = %s
+                    ORDER BY category ASC
+                    """,
+                    (user_key,),
+                ).fetchall()
 
     def save_pending_receipt(self, pending: PendingReceipt) -> None:
         with self.pool.connection() as conn:
@@ -353,38 +398,25 @@ class ExpenseDB:
 
     def get_pending_receipt(self, user_key: str) -> Optional[PendingReceipt]:
         with self.pool.connection() as conn:
-            row = conn.execute(
-                """
-                SELECT user_key, item, amount, category, expense_date, raw_payload, is_bank_transaction
-                FROM pending_receipts
-                WHERE user_key = %s
-                """,
-                (user_key,),
-            ).fetchone()
-        if not row:
-            return None
-        return PendingReceipt(
-            user_key=str(row["user_key"]),
-            item=str(row["item"]),
-            amount=int(row["amount"]),
-            category=str(row["category"]),
-            expense_date=row["expense_date"],
-            raw_payload=dict(row["raw_payload"] or {}),
-            is_bank_transaction=bool(row["is_bank_transaction"]),
-        )
+            with conn.cursor(row_factory=class_row(PendingReceipt)) as cur:
+                return cur.execute(
+                    """
+                    SELECT user_key, item, amount, category, expense_date, raw_payload, is_bank_transaction
+                    FROM pending_receipts
+                    WHERE user_key = %s
+                    """,
+                    (user_key,),
+                ).fetchone()
 
     def clear_pending_receipt(self, user_key: str) -> None:
         with self.pool.connection() as conn:
             conn.execute("DELETE FROM pending_receipts WHERE user_key = %s", (user_key,))
 
-    @staticmethod
-    def _row_to_expense(row: dict[str, Any]) -> ExpenseRecord:
-        return ExpenseRecord(
-            id=int(row["id"]),
-            user_key=str(row["user_key"]),
-            item=str(row["item"]),
-            amount=int(row["amount"]),
-            category=str(row["category"]),
-            expense_date=row["expense_date"],
-            created_at=row["created_at"],
-        )
+    def _cache_expiry(self) -> float:
+        return time.monotonic() + self.BUDGET_CACHE_TTL_SECONDS
+
+    def _scalar(self, query: str, params: tuple[Any, ...]) -> int:
+        with self.pool.connection() as conn:
+            with conn.cursor(row_factory=tuple_row) as cur:
+                row = cur.execute(query, params).fetchone()
+        return row[0] if row else 0
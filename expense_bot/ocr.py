@@ -1,8 +1,13 @@
 from __future__ import annotations
 
+import asyncio
 import base64
+import bisect
+import hashlib
+import logging
 import re
-from dataclasses import dataclass
+from collections import OrderedDict
+from dataclasses import dataclass, field
 from datetime import date
 from typing import Any, Iterable, Optional, Sequence
 
@@ -11,14 +16,24 @@ import httpx
 from .parser import format_date_id, format_idr, infer_category, parse_amount_token, parse_date_input
 
 
+logger = logging.getLogger(__name__)
+
+
+def _compile_keyword_re(keywords: Sequence[str]) -> re.Pattern[str]:
+    return re.compile("|".join(re.escape(keyword) for keyword in keywords))
+
+
 DATE_RE = re.compile(r"\b(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})\b")
 DATE_WORD_RE = re.compile(
     r"\b(\d{1,2}\s+(?:jan|feb|mar|apr|mei|may|jun|jul|agu|aug|sep|okt|oct|nov|des|dec)[a-z]*\s+\d{2,4})\b",
     re.I,
 )
 MONEY_TOKEN_RE = re.compile(
-    r"(?i)\b(?:rp\.?\s*|idr\s*)?\d[\d.,]*(?:\s*(?:rb|ribu|k|jt|juta)\b)?\b"
+    r"(?i)\b(?P<currency>rp\.?[^\S\n]*|idr[^\S\n]*)?(?P<number>\d[\d.,]*)"
+    r"(?:[^\S\n]*(?P<suffix>rb|ribu|k|jt|juta)\b)?\b"
 )
+NON_DIGIT_RE = re.compile(r"\D")
+WHITESPACE_RE = re.compile(r"\s+")
 TOTAL_KEYWORDS = (
     "grand total",
     "total bayar",
@@ -36,6 +51,15 @@ BANK_TOTAL_KEYWORDS = (
     "nominal",
     "total debit",
 )
+BANK_AND_TOTAL_KEYWORDS = BANK_TOTAL_KEYWORDS + TOTAL_KEYWORDS
+TOTAL_KEYWORD_RE = _compile_keyword_re(TOTAL_KEYWORDS)
+BANK_TOTAL_KEYWORD_RE = _compile_keyword_re(BANK_AND_TOTAL_KEYWORDS)
+TOTAL_CUT_LABELS_RE = re.compile(
+    r"(?i)\b("
+    r"source of fund|qris reference|reference|ref no|merchant pan|customer pan|"
+    r"terminal id|acquirer|saldo|balance|available|fee|admin"
+    r")\b"
+)
 IGNORE_TOTAL_HINTS = (
     "ppn",
     "tax",
@@ -94,6 +118,21 @@ BANK_HINTS = (
     "trx",
     "ref",
 )
+BANK_CONTEXT_HINTS = (
+    "transfer",
+    "penerima",
+    "recipient",
+    "beneficiary",
+    "receiver",
+    "rekening",
+    "account",
+    "nominal",
+    "debit",
+    "saldo",
+    "ref",
+    "trx",
+    "qris",
+)
 BANK_NAMES = (
     "bca",
     "bri",
@@ -145,63 +184,72 @@ class ReceiptExtraction:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class OCRResult:
     raw_text: str
     receipt: Optional[ReceiptExtraction]
     structured_data: Optional[dict[str, Any]]
     needs_manual_total_confirmation: bool
-    reply_text: str
+    _reply_text: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+
+    @property
+    def reply_text(self) -> str:
+        if self._reply_text is None:
+            self._reply_text = _format_reply_text(self.receipt)
+        return self._reply_text
 
 
 def _normalize_lines(ocr_input: str | Sequence[str]) -> list[str]:
-    if isinstance(ocr_input, str):
-        raw_lines = ocr_input.splitlines()
-    else:
-        raw_lines = list(ocr_input)
-    return [re.sub(r"\s+", " ", line).strip() for line in raw_lines if str(line).strip()]
+    raw_lines = ocr_input.splitlines() if isinstance(ocr_input, str) else ocr_input
+    return [line for line in (WHITESPACE_RE.sub(" ", raw).strip() for raw in raw_lines) if line]
 
 
 def _extract_amounts(text: str) -> list[int]:
-    candidates = [match.group(0) for match in MONEY_TOKEN_RE.finditer(text)]
     amounts: list[int] = []
-    for token in candidates:
-        if not _is_plausible_money_token(token):
-            continue
-        parsed = parse_amount_token(token)
-        if parsed and 100 <= parsed <= 2_000_000_000:
-            amounts.append(parsed)
+    for match in MONEY_TOKEN_RE.finditer(text):
+        amount = _parse_money_match(match)
+        if amount is not None:
+            amounts.append(amount)
     return amounts
 
 
-def _is_plausible_money_token(token: str) -> bool:
-    token_low = token.lower().strip()
-    clean = token_low.replace(" ", "")
-    has_currency = ("rp" in token_low) or ("idr" in token_low)
-    clean = clean.replace("rp.", "").replace("rp", "").replace("idr", "")
-    if not clean:
-        return False
+def _extract_amounts_by_line(lines: list[str]) -> list[list[int]]:
+    line_starts = [0]
+    for line in lines:
+        line_starts.append(line_starts[-1] + len(line) + 1)
+
+    amounts_by_line: list[list[int]] = [[] for _ in lines]
+    for match in MONEY_TOKEN_RE.finditer("\n".join(lines)):
+        amount = _parse_money_match(match)
+        if amount is not None:
+            amounts_by_line[bisect.bisect_right(line_starts, match.start()) - 1].append(amount)
+    return amounts_by_line
+
+
+def _parse_money_match(match: re.Match[str]) -> Optional[int]:
+    if not _is_plausible_money_match(match):
+        return None
+    parsed = parse_amount_token(match.group(0))
+    if parsed and 100 <= parsed <= 2_000_000_000:
+        return parsed
+    return None
 
-    has_suffix = clean.endswith(("rb", "ribu", "k", "jt", "juta"))
-    digits_only = re.sub(r"\D", "", clean)
-    if not digits_only:
-        return False
 
-    if not has_suffix and len(digits_only) > 12:
+def _is_plausible_money_match(match: re.Match[str]) -> bool:
+    if match.group("suffix"):
+        return True
+
+    number = match.group("number")
+    digits_only = NON_DIGIT_RE.sub("", number)
+    if len(digits_only) > 12:
         return False
 
-    if (
-        not has_suffix
-        and not has_currency
-        and "." not in clean
-        and "," not in clean
-        and len(digits_only) >= 8
-    ):
+    has_separator = "." in number or "," in number
+    if not has_separator and not match.group("currency") and len(digits_only) >= 8:
         return False
 
-    if not has_suffix and ("." in clean or "," in clean):
-        normalized = clean.replace(",", ".")
-        groups = normalized.split(".")
+    if has_separator:
+        groups = number.replace(",", ".").split(".")
         if len(groups) > 5:
             return False
         if len(groups) > 1 and any(len(part) != 3 for part in groups[1:]):
@@ -220,8 +268,8 @@ def _pick_merchant(lines: list[str]) -> str:
         if any(hint in low for hint in MERCHANT_SKIP_HINTS):
             continue
 
-        letters = sum(1 for char in line if char.isalpha())
-        digits = sum(1 for char in line if char.isdigit())
+        letters = sum(map(str.isalpha, line))
+        digits = sum(map(str.isdigit, line))
         score = letters - (digits * 2)
         if "rp" in low:
             score -= 8
@@ -233,30 +281,18 @@ def _pick_merchant(lines: list[str]) -> str:
 
 def _detect_bank_transaction(lines: list[str]) -> bool:
     joined = " ".join(lines).lower()
-    has_bank_name = any(bank in joined for bank in BANK_NAMES)
-    has_bank_context = any(
-        hint in joined
-        for hint in (
-            "transfer",
-            "penerima",
-            "recipient",
-            "beneficiary",
-            "receiver",
-            "rekening",
-            "account",
-            "nominal",
-            "debit",
-            "saldo",
-            "ref",
-            "trx",
-            "qris",
-        )
-    )
-    if has_bank_name and has_bank_context:
+    if any(bank in joined for bank in BANK_NAMES) and any(
+        hint in joined for hint in BANK_CONTEXT_HINTS
+    ):
         return True
 
-    score = sum(1 for hint in BANK_HINTS if hint in joined)
-    return score >= 2
+    score = 0
+    for hint in BANK_HINTS:
+        if hint in joined:
+            score += 1
+            if score >= 2:
+                return True
+    return False
 
 
 def _pick_bank_merchant(lines: list[str]) -> str:
@@ -286,7 +322,7 @@ def _pick_bank_merchant(lines: list[str]) -> str:
                 candidate = lines[idx + 1].strip()
 
             candidate_low = candidate.lower()
-            digit_ratio = sum(char.isdigit() for char in candidate) / max(len(candidate), 1)
+            digit_ratio = sum(map(str.isdigit, candidate)) / max(len(candidate), 1)
             if (
                 len(candidate) >= 3
                 and not any(hint in candidate_low for hint in invalid_hints)
@@ -316,38 +352,40 @@ def _pick_category(merchant: str, lines: Iterable[str]) -> str:
 
 
 def _extract_total(lines: list[str], is_bank_transaction: bool) -> tuple[Optional[int], bool]:
-    keywords = BANK_TOTAL_KEYWORDS + TOTAL_KEYWORDS if is_bank_transaction else TOTAL_KEYWORDS
+    if is_bank_transaction:
+        keywords, keyword_re = BANK_AND_TOTAL_KEYWORDS, BANK_TOTAL_KEYWORD_RE
+    else:
+        keywords, keyword_re = TOTAL_KEYWORDS, TOTAL_KEYWORD_RE
+    amounts_by_line = _extract_amounts_by_line(lines)
     keyword_amounts: list[int] = []
-    cut_labels_re = re.compile(
-        r"(?i)\b("
-        r"source of fund|qris reference|reference|ref no|merchant pan|customer pan|"
-        r"terminal id|acquirer|saldo|balance|available|fee|admin"
-        r")\b"
-    )
 
     for idx, line in enumerate(lines):
         low = line.lower()
         if "subtotal" in low or "sub total" in low:
             continue
-        if not any(keyword in low for keyword in keywords):
+        if not keyword_re.search(low):
             continue
 
+        # One hit per keyword present, overlaps included: "Total Bayar" counts for both
+        # "total bayar" and "total", which weights the median towards the final total.
         found_inline = False
         for keyword in keywords:
-            if keyword in low:
-                segment = line[low.find(keyword) + len(keyword) :]
-                cut_match = cut_labels_re.search(segment)
-                if cut_match:
-                    segment = segment[: cut_match.start()]
-                amounts = _extract_amounts(segment)
-                if amounts:
-                    keyword_amounts.append(amounts[0])
-                    found_inline = True
+            position = low.find(keyword)
+            if position < 0:
+                continue
+            segment = line[position + len(keyword) :]
+            cut_match = TOTAL_CUT_LABELS_RE.search(segment)
+            if cut_match:
+                segment = segment[: cut_match.start()]
+            amounts = _extract_amounts(segment)
+            if amounts:
+                keyword_amounts.append(amounts[0])
+                found_inline = True
 
         if not found_inline and idx + 1 < len(lines):
             next_line = lines[idx + 1].lower()
             if not any(hint in next_line for hint in IGNORE_TOTAL_HINTS):
-                next_amounts = _extract_amounts(lines[idx + 1])
+                next_amounts = amounts_by_line[idx + 1]
                 if next_amounts:
                     keyword_amounts.append(next_amounts[0])
 
@@ -356,11 +394,11 @@ def _extract_total(lines: list[str], is_bank_transaction: bool) -> tuple[Optiona
         return sorted_amounts[len(sorted_amounts) // 2], False
 
     all_amounts: list[int] = []
-    for line in lines:
+    for line, line_amounts in zip(lines, amounts_by_line):
         low = line.lower()
         if any(hint in low for hint in IGNORE_TOTAL_HINTS):
             continue
-        all_amounts.extend([amount for amount in _extract_amounts(line) if amount >= 1000])
+        all_amounts.extend([amount for amount in line_amounts if amount >= 1000])
 
     if all_amounts:
         return max(all_amounts), True
@@ -372,8 +410,8 @@ def _is_noisy(lines: list[str], total: Optional[int], used_fallback_total: bool)
         return True
 
     joined = " ".join(lines)
-    alnum_count = sum(1 for char in joined if char.isalnum())
-    printable_count = sum(1 for char in joined if char.strip())
+    alnum_count = sum(map(str.isalnum, joined))
+    printable_count = len(joined) - sum(map(str.isspace, joined))
     ratio = (alnum_count / printable_count) if printable_count else 0
 
     very_short = len(lines) <= 2
@@ -397,10 +435,6 @@ def extract_receipt_data(ocr_input: str | Sequence[str]) -> OCRResult:
             receipt=None,
             structured_data=None,
             needs_manual_total_confirmation=True,
-            reply_text=(
-                "Sepertinya hasil scan struknya belum cukup jelas. "
-                "Boleh konfirmasi total belanjanya dulu?"
-            ),
         )
 
     merchant = _pick_bank_merchant(lines) if is_bank_transaction else _pick_merchant(lines)
@@ -424,8 +458,23 @@ def extract_receipt_data(ocr_input: str | Sequence[str]) -> OCRResult:
         used_fallback_total=used_fallback,
         is_bank_transaction=is_bank_transaction,
     )
-    source_label = "bukti transaksi bank" if is_bank_transaction else "struk"
-    confirmation = (
+    return OCRResult(
+        raw_text=raw_text,
+        receipt=receipt,
+        structured_data=receipt.to_json(),
+        needs_manual_total_confirmation=False,
+    )
+
+
+def _format_reply_text(receipt: Optional[ReceiptExtraction]) -> str:
+    if receipt is None:
+        return (
+            "Sepertinya hasil scan struknya belum cukup jelas. "
+            "Boleh konfirmasi total belanjanya dulu?"
+        )
+
+    source_label = "bukti transaksi bank" if receipt.is_bank_transaction else "struk"
+    return (
         f"Wah, {source_label} dari {receipt.merchant} kebaca nih:\n\n"
         f"Item: {receipt.item}\n"
         f"Total: {format_idr(receipt.total)}\n"
@@ -433,49 +482,126 @@ def extract_receipt_data(ocr_input: str | Sequence[str]) -> OCRResult:
         f"Tanggal: {receipt.tanggal}\n\n"
         "Balas `simpan` untuk catat, atau `ubah total/kategori/merchant/tanggal ...`."
     )
-    return OCRResult(
-        raw_text=raw_text,
-        receipt=receipt,
-        structured_data=receipt.to_json(),
-        needs_manual_total_confirmation=False,
-        reply_text=confirmation,
-    )
 
 
 class ReceiptOCR:
-    def __init__(self, endpoint_url: str, api_token: str, model_id: str) -> None:
+    TEXT_CACHE_SIZE = 256
+
+    def __init__(
+        self,
+        endpoint_url: str,
+        api_token: str,
+        model_id: str,
+        max_concurrency: int = 4,
+        fallback_model_id: str = "",
+    ) -> None:
         self.endpoint_url = endpoint_url.strip()
         self.api_token = api_token.strip()
         self.model_id = model_id.strip() or "microsoft/Florence-2-base"
+        self.fallback_model_id = fallback_model_id.strip()
+        self.scan_count = 0
+        self.escalation_count = 0
+        self._client = httpx.AsyncClient(
+            http2=True,
+            timeout=60.0,
+            limits=httpx.Limits(max_keepalive_connections=10),
+        )
+        self._text_cache: OrderedDict[str, str] = OrderedDict()
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrency))
 
     @property
     def enabled(self) -> bool:
         return bool(self.endpoint_url)
 
-    async def scan_receipt(self, image_bytes: bytes) -> Optional[OCRResult]:
-        if not self.enabled:
-            return None
+    @property
+    def fallback_enabled(self) -> bool:
+        return bool(self.fallback_model_id) and self.fallback_model_id != self.model_id
+
+    async def aclose(self) -> None:
+        if self._client.is_closed:
+            return
+        await self._client.aclose()
 
-        raw_text = await self._extract_text_with_florence(image_bytes)
-        if not raw_text:
+    async def scan_receipt(self, image_bytes: bytes | bytearray) -> Optional[OCRResult]:
+        if not self.enabled:
             return None
-        return extract_receipt_data(raw_text)
 
-    async def _extract_text_with_florence(self, image_bytes: bytes) -> str:
+        self.scan_count += 1
+        try:
+            result = await self._scan_with_model(image_bytes, self.model_id)
+        except Exception:
+            if not self.fallback_enabled:
+                raise
+            logger.exception("Gagal scan struk dengan model utama %s", self.model_id)
+            result = None
+        if not self._should_escalate(result):
+            return result
+
+        if self._text_cache_key(image_bytes, self.fallback_model_id) not in self._text_cache:
+            self.escalation_count += 1
+            logger.info(
+                "OCR dieskalasi ke %s (%d dari %d scan)",
+                self.fallback_model_id,
+                self.escalation_count,
+                self.scan_count,
+            )
+        try:
+            fallback_result = await self._scan_with_model(image_bytes, self.fallback_model_id)
+        except Exception:
+            if result is None:
+                raise
+            logger.exception("Gagal scan struk dengan model cadangan %s", self.fallback_model_id)
+            return result
+        if result is None or (
+            fallback_result is not None
+            and fallback_result.receipt is not None
+            and not fallback_result.needs_manual_total_confirmation
+        ):
+            return fallback_result
+        return result
+
+    def _should_escalate(self, result: Optional[OCRResult]) -> bool:
+        if not self.fallback_enabled:
+            return False
+        return result is None or result.receipt is None or result.needs_manual_total_confirmation
+
+    async def _scan_with_model(
+        self, image_bytes: bytes | bytearray, model_id: str
+    ) -> Optional[OCRResult]:
+        cache_key = self._text_cache_key(image_bytes, model_id)
+        raw_text = self._text_cache.get(cache_key)
+        if raw_text is None:
+            async with self._semaphore:
+                raw_text = await self._extract_text_with_florence(image_bytes, model_id)
+            if not raw_text:
+                return None
+            self._text_cache[cache_key] = raw_text
+            if len(self._text_cache) > self.TEXT_CACHE_SIZE:
+                self._text_cache.popitem(last=False)
+        else:
+            self._text_cache.move_to_end(cache_key)
+        return await asyncio.to_thread(extract_receipt_data, raw_text)
+
+    def _text_cache_key(self, image_bytes: bytes | bytearray, model_id: str) -> str:
+        digest = hashlib.blake2b(image_bytes, digest_size=16).hexdigest()
+        return f"{model_id}:<OCR>:{digest}"
+
+    async def _extract_text_with_florence(
+        self, image_bytes: bytes | bytearray, model_id: str
+    ) -> str:
         headers = {"Content-Type": "application/json"}
         if self.api_token:
             headers["Authorization"] = f"Bearer {self.api_token}"
 
         payload = {
-            "model": self.model_id,
+            "model": model_id,
             "task_prompt": "<OCR>",
             "image_base64": base64.b64encode(image_bytes).decode("utf-8"),
         }
 
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(self.endpoint_url, json=payload, headers=headers)
-            response.raise_for_status()
-            response_payload = response.json()
+        response = await self._client.post(self.endpoint_url, json=payload, headers=headers)
+        response.raise_for_status()
+        response_payload = response.json()
 
         text = self._extract_text_from_response(response_payload)
         if not text:
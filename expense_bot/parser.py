@@ -3,18 +3,30 @@ from __future__ import annotations
 import re
 from dataclasses import dataclass
 from datetime import date
+from functools import lru_cache
 from typing import Optional
 
 
 AMOUNT_TOKEN_RE = re.compile(
-    r"(?i)(?:rp\.?\s*)?(\d+(?:[.,]\d+)?(?:[.,]\d{3})*)(?:\s*(rb|ribu|k|jt|juta)\b)?"
+    r"(?i)(?:rp\.?\s*)?(\d++(?:[.,]\d++)?+(?:[.,]\d{3})*+)(?:\s*(rb|ribu|k|jt|juta)\b)?"
 )
-PERCENT_RE = re.compile(r"(?i)(\d+(?:[.,]\d+)?)\s*%")
+PERCENT_RE = re.compile(r"(?i)(\d++(?:[.,]\d++)?+)\s*%")
 DATE_RE = re.compile(r"(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})")
 DATE_WORD_RE = re.compile(r"(?i)\b(\d{1,2})\s+([a-z]{3,12})\s+(\d{2,4})\b")
+DATE_PARTS_RE = re.compile(r"\b(\d{1,2})[/-](\d{1,2})[/-](\d{2,4})\b")
+CATEGORY_SUFFIX_RE = re.compile(r"(?i)(?:kategori|cat)\s*[:=-]?\s*([a-zA-Z/& ]+)$")
+PEOPLE_AFTER_KEYWORD_RE = re.compile(r"(?i)(?:bagi|untuk|dibagi)\s*(\d+)\s*(?:orang|org|pax|teman)?")
+PEOPLE_COUNT_RE = re.compile(r"(?i)(\d+)\s*(?:orang|org|pax|teman)")
+MERCHANT_WORD_RE = re.compile(r"[a-zA-Z]{3,}")
+RECEIPT_KEYWORD_RES = (
+    re.compile(
+        r"(?i)(?:grand\s*total|total\s*bayar|jumlah\s*bayar|total)\D{0,8}((?:rp\.?\s*)?\d[\d.,]*(?:\s*(?:rb|ribu|k|jt|juta))?)"
+    ),
+    re.compile(r"(?i)(?:payment|paid)\D{0,8}((?:rp\.?\s*)?\d[\d.,]*(?:\s*(?:rb|ribu|k|jt|juta))?)"),
+)
 
 CATEGORY_KEYWORDS = {
-    "Makanan & Minuman": [
+    "Makanan & Minuman": (
         "kopi",
         "makan",
         "minum",
@@ -24,8 +36,8 @@ CATEGORY_KEYWORDS = {
         "grabfood",
         "snack",
         "jajan",
-    ],
-    "Transportasi": [
+    ),
+    "Transportasi": (
         "bensin",
         "bbm",
         "parkir",
@@ -36,8 +48,8 @@ CATEGORY_KEYWORDS = {
         "kereta",
         "bus",
         "ojek",
-    ],
-    "Belanja": [
+    ),
+    "Belanja": (
         "belanja",
         "indomaret",
         "alfamart",
@@ -47,8 +59,8 @@ CATEGORY_KEYWORDS = {
         "lazada",
         "pakaian",
         "sepatu",
-    ],
-    "Tagihan": [
+    ),
+    "Tagihan": (
         "listrik",
         "pln",
         "air",
@@ -58,8 +70,8 @@ CATEGORY_KEYWORDS = {
         "paket data",
         "token",
         "bpjs",
-    ],
-    "Hiburan": [
+    ),
+    "Hiburan": (
         "nonton",
         "bioskop",
         "netflix",
@@ -67,24 +79,40 @@ CATEGORY_KEYWORDS = {
         "game",
         "steam",
         "rekreasi",
-    ],
-    "Kesehatan": [
+    ),
+    "Kesehatan": (
         "dokter",
         "obat",
         "klinik",
         "apotek",
         "vitamin",
         "rumah sakit",
-    ],
-    "Pendidikan": [
+    ),
+    "Pendidikan": (
         "kursus",
         "buku",
         "sekolah",
         "kuliah",
         "pelatihan",
-    ],
+    ),
+}
+
+CATEGORY_BY_LOWER = {category.lower(): category for category in CATEGORY_KEYWORDS}
+KEYWORD_CATEGORIES = tuple(
+    (keyword, category) for category, keywords in CATEGORY_KEYWORDS.items() for keyword in keywords
+)
+
+SUFFIX_MULTIPLIERS = {
+    "rb": 1000,
+    "ribu": 1000,
+    "k": 1000,
+    "jt": 1000000,
+    "juta": 1000000,
 }
 
+AMOUNT_NOISE_RE = re.compile(r"^\s*(?:rp\.?|idr)|\s+")
+AMOUNT_SUFFIX_RE = re.compile(r"(?:ribu|rb|k|juta|jt)$")
+
 STOPWORDS = (
     "beli",
     "bayar",
@@ -96,6 +124,9 @@ STOPWORDS = (
     "topup",
     "top up",
 )
+STOPWORD_PREFIX_RE = re.compile(
+    "(?i)(?:" + "|".join(re.escape(stopword) for stopword in STOPWORDS) + ") "
+)
 
 MONTH_NAME_MAP = {
     "jan": 1,
@@ -165,10 +196,12 @@ class ReceiptInfo:
     category: str
 
 
+@lru_cache(maxsize=2048)
 def format_idr(amount: int) -> str:
     return f"Rp{amount:,}".replace(",", ".")
 
 
+@lru_cache(maxsize=512)
 def format_date_id(value: date) -> str:
     return value.strftime("%d/%m/%Y")
 
@@ -178,7 +211,7 @@ def parse_date_input(text: str) -> Optional[date]:
     if not clean:
         return None
 
-    match = re.search(r"\b(\d{1,2})[/-](\d{1,2})[/-](\d{2,4})\b", clean)
+    match = DATE_PARTS_RE.search(clean)
     if match:
         day = int(match.group(1))
         month = int(match.group(2))
@@ -209,17 +242,15 @@ def parse_date_input(text: str) -> Optional[date]:
 
 
 def parse_amount_token(token: str) -> Optional[int]:
-    token_lower = token.strip().lower().replace("rp", "").replace("idr", "")
-    token_lower = token_lower.replace(" ", "")
+    token_lower = AMOUNT_NOISE_RE.sub("", token.lower())
     if not token_lower:
         return None
 
     suffix = ""
-    for candidate in ("ribu", "rb", "k", "juta", "jt"):
-        if token_lower.endswith(candidate):
-            suffix = candidate
-            token_lower = token_lower[: -len(candidate)]
-            break
+    suffix_match = AMOUNT_SUFFIX_RE.search(token_lower)
+    if suffix_match:
+        suffix = suffix_match.group(0)
+        token_lower = token_lower[: suffix_match.start()]
 
     if not token_lower:
         return None
@@ -236,11 +267,7 @@ def parse_amount_token(token: str) -> Optional[int]:
     except ValueError:
         return None
 
-    if suffix in {"rb", "ribu", "k"}:
-        return int(round(base_float * 1000))
-    if suffix in {"jt", "juta"}:
-        return int(round(base_float * 1000000))
-    return int(round(base_float))
+    return int(round(base_float * SUFFIX_MULTIPLIERS[suffix]))
 
 
 def parse_amount_from_text(text: str) -> Optional[int]:
@@ -254,31 +281,29 @@ def parse_amount_from_text(text: str) -> Optional[int]:
     return amount
 
 
+@lru_cache(maxsize=512)
 def infer_category(item_text: str) -> str:
     low = item_text.lower()
-    for category, keywords in CATEGORY_KEYWORDS.items():
-        if any(keyword in low for keyword in keywords):
+    for keyword, category in KEYWORD_CATEGORIES:
+        if keyword in low:
             return category
     return "Lainnya"
 
 
 def normalize_category(name: str) -> str:
-    clean = re.sub(r"\s+", " ", name).strip().lower()
+    clean = " ".join(name.split()).lower()
     if not clean:
         return "Lainnya"
-    for category in CATEGORY_KEYWORDS:
-        if clean == category.lower():
-            return category
-    return clean.title()
+    return CATEGORY_BY_LOWER.get(clean) or clean.title()
 
 
 def parse_expense_input(text: str) -> Optional[ParsedExpense]:
-    clean = re.sub(r"\s+", " ", text.strip())
+    clean = " ".join(text.split())
     if not clean:
         return None
 
     category = ""
-    category_match = re.search(r"(?i)(?:kategori|cat)\s*[:=-]?\s*([a-zA-Z/& ]+)$", clean)
+    category_match = CATEGORY_SUFFIX_RE.search(clean)
     if category_match:
         category = normalize_category(category_match.group(1))
         clean = clean[: category_match.start()].strip()
@@ -291,14 +316,12 @@ def parse_expense_input(text: str) -> Optional[ParsedExpense]:
     if not amount or amount <= 0:
         return None
 
-    item_candidate = (clean[: amount_match.start()] + clean[amount_match.end() :]).strip(
-        " ,.-:"
-    )
-    item_low = item_candidate.lower()
-    for stopword in STOPWORDS:
-        if item_low.startswith(stopword + " "):
-            item_candidate = item_candidate[len(stopword) :].strip()
-            break
+    start, end = amount_match.span()
+    item_candidate = clean[:start] if end == len(clean) else clean[:start] + clean[end:]
+    item_candidate = item_candidate.strip(" ,.-:")
+    stopword_match = STOPWORD_PREFIX_RE.match(item_candidate)
+    if stopword_match:
+        item_candidate = item_candidate[stopword_match.end() :].strip()
 
     if not item_candidate:
         return None
@@ -308,31 +331,41 @@ def parse_expense_input(text: str) -> Optional[ParsedExpense]:
     return ParsedExpense(item=item, amount=amount, category=selected_category)
 
 
+@lru_cache(maxsize=64)
+def _keyword_percentage_re(keyword: str) -> re.Pattern[str]:
+    return re.compile(rf"(?i){re.escape(keyword)}\s*[:=]?\s*([0-9]++(?:[.,][0-9]++)?+)\s*%")
+
+
+@lru_cache(maxsize=64)
+def _keyword_amount_re(keyword: str) -> re.Pattern[str]:
+    return re.compile(
+        rf"(?i){re.escape(keyword)}\s*[:=]?\s*((?:rp\.?\s*)?\d[\d.,]*+(?:\s*(?:rb|ribu|k|jt|juta)\b)?)(?![\d%])"
+    )
+
+
 def parse_percentage_after_keyword(text: str, keyword: str) -> Optional[float]:
-    match = re.search(rf"(?i){re.escape(keyword)}\s*[:=]?\s*([0-9]+(?:[.,][0-9]+)?)\s*%", text)
+    match = _keyword_percentage_re(keyword).search(text)
     if not match:
         return None
     return float(match.group(1).replace(",", "."))
 
 
 def parse_amount_after_keyword(text: str, keyword: str) -> Optional[int]:
-    match = re.search(
-        rf"(?i){re.escape(keyword)}\s*[:=]?\s*((?:rp\.?\s*)?\d[\d.,]*(?:\s*(?:rb|ribu|k|jt|juta)\b)?)(?![\d%])",
-        text,
-    )
+    match = _keyword_amount_re(keyword).search(text)
     if not match:
         return None
     return parse_amount_token(match.group(1))
 
 
-def parse_split_bill(text: str) -> Optional[ParsedSplitBill]:
-    low = text.lower()
+def parse_split_bill(text: str, low: Optional[str] = None) -> Optional[ParsedSplitBill]:
+    if low is None:
+        low = text.lower()
     if "split bill" not in low and "patungan" not in low:
         return None
 
-    people_match = re.search(r"(?i)(?:bagi|untuk|dibagi)\s*(\d+)\s*(?:orang|org|pax|teman)?", low)
+    people_match = PEOPLE_AFTER_KEYWORD_RE.search(low)
     if not people_match:
-        people_match = re.search(r"(?i)(\d+)\s*(?:orang|org|pax|teman)", low)
+        people_match = PEOPLE_COUNT_RE.search(low)
     if not people_match:
         return None
 
@@ -385,7 +418,7 @@ def parse_receipt_text(raw_text: str) -> Optional[ReceiptInfo]:
         low = line.lower()
         if any(token in low for token in ("struk", "receipt", "tanggal", "date", "no.")):
             continue
-        if re.search(r"[a-zA-Z]{3,}", line):
+        if MERCHANT_WORD_RE.search(line):
             merchant = line.title()
             break
 
@@ -393,12 +426,8 @@ def parse_receipt_text(raw_text: str) -> Optional[ReceiptInfo]:
     date_text = date_match.group(1) if date_match else None
 
     total = None
-    keyword_patterns = [
-        r"(?i)(?:grand\s*total|total\s*bayar|jumlah\s*bayar|total)\D{0,8}((?:rp\.?\s*)?\d[\d.,]*(?:\s*(?:rb|ribu|k|jt|juta))?)",
-        r"(?i)(?:payment|paid)\D{0,8}((?:rp\.?\s*)?\d[\d.,]*(?:\s*(?:rb|ribu|k|jt|juta))?)",
-    ]
-    for pattern in keyword_patterns:
-        match = re.search(pattern, raw_text)
+    for pattern in RECEIPT_KEYWORD_RES:
+        match = pattern.search(raw_text)
         if match:
             parsed = parse_amount_token(match.group(1))
             if parsed and parsed > 0:
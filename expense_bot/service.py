@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import math
 import re
 from collections import defaultdict
 from datetime import date
@@ -16,6 +15,17 @@ from .parser import (
     parse_split_bill,
 )
 
+FINANCIAL_TOPIC_RE = re.compile(r"investasi|crypto|kripto|forex|leverage|futures")
+REMOVED_REPORT_RE = re.compile(r"laporan (minggu|bulan)")
+REMOVED_REPORT_REPLIES = {
+    "minggu": "Perintah laporan minggu sudah dihapus. Pakai `/total_minggu` ya.",
+    "bulan": "Perintah laporan bulan sudah dihapus. Pakai `/total_bulan` ya.",
+}
+BUDGET_CATEGORY_RE = re.compile(r"(?i)budget\s+kategori")
+BUDGET_CATEGORY_ARGS_RE = re.compile(
+    r"(?i)budget\s+kategori\s+(.+?)\s+((?:rp\.?\s*)?\d[\d.,]*(?:\s*(?:rb|ribu|k|jt|juta))?)$"
+)
+
 
 class ExpenseService:
     def __init__(self, db: ExpenseDB, timezone_name: str = "Asia/Jakarta") -> None:
@@ -50,23 +60,19 @@ class ExpenseService:
         if not clean:
             return "Kirim item + nominal ya. Contoh: `beli kopi 25rb`"
 
-        normalized = clean.lower().strip()
+        normalized = clean.lower()
         if normalized in {"start", "help", "/start", "/help"}:
             return self.help_text()
-        if "laporan minggu" in normalized:
-            return "Perintah laporan minggu sudah dihapus. Pakai `/total_minggu` ya."
-        if "laporan bulan" in normalized or "laporan bulanan" in normalized:
-            return "Perintah laporan bulan sudah dihapus. Pakai `/total_bulan` ya."
-        if any(
-            keyword in normalized
-            for keyword in ("investasi", "crypto", "kripto", "forex", "leverage", "futures")
-        ):
+        report_match = REMOVED_REPORT_RE.search(normalized)
+        if report_match:
+            return REMOVED_REPORT_REPLIES[report_match.group(1)]
+        if FINANCIAL_TOPIC_RE.search(normalized):
             return (
                 "Aku fokus bantu pencatatan, budget, dan penghematan dulu ya.\n"
                 "Kalau mau, aku bisa bantu hitung pos pengeluaran yang bisa dipangkas."
             )
 
-        split = parse_split_bill(clean)
+        split = parse_split_bill(clean, normalized)
         if split:
             return self._reply_split_bill(split)
 
@@ -140,7 +146,7 @@ class ExpenseService:
             lines.append(
                 (
                     f"#{rec.id} | {format_date_id(rec.expense_date)} | "
-                    f"{created_local.strftime('%H:%M')} | {rec.item} | "
+                    f"{created_local.hour:02d}:{created_local.minute:02d} | {rec.item} | "
                     f"{format_idr(rec.amount)} | {rec.category}"
                 )
             )
@@ -166,7 +172,8 @@ class ExpenseService:
             category_totals[rec.category] += rec.amount
             lines.append(
                 (
-                    f"#{rec.id} | {format_date_id(rec.expense_date)} {local_dt.strftime('%H:%M')} | "
+                    f"#{rec.id} | {format_date_id(rec.expense_date)} "
+                    f"{local_dt.hour:02d}:{local_dt.minute:02d} | "
                     f"{rec.item} | {format_idr(rec.amount)} | {rec.category}"
                 )
             )
@@ -197,13 +204,8 @@ class ExpenseService:
         return f"Semua data kamu dihapus ({count} transaksi)."
 
     def reply_budget(self, user_key: str, raw_text: str, args: list[str]) -> str:
-        text_lower = raw_text.lower()
-
-        if re.search(r"(?i)budget\s+kategori", raw_text):
-            match = re.search(
-                r"(?i)budget\s+kategori\s+(.+?)\s+((?:rp\.?\s*)?\d[\d.,]*(?:\s*(?:rb|ribu|k|jt|juta))?)$",
-                raw_text,
-            )
+        if BUDGET_CATEGORY_RE.search(raw_text):
+            match = BUDGET_CATEGORY_ARGS_RE.search(raw_text)
             if not match:
                 return "Format budget kategori: /budget kategori <nama kategori> <nominal>"
             category = normalize_category(match.group(1))
@@ -217,7 +219,7 @@ class ExpenseService:
         if args:
             amount = parse_amount_from_text(" ".join(args))
         if amount is None:
-            amount = parse_amount_from_text(text_lower.replace("atur", "").replace("set", ""))
+            amount = parse_amount_from_text(raw_text.lower().replace("atur", "").replace("set", ""))
 
         if amount and amount > 0:
             self.db.set_weekly_budget(user_key=user_key, amount=amount)
@@ -253,7 +255,7 @@ class ExpenseService:
         self.db.save_pending_receipt(pending)
 
     def _reply_split_bill(self, split) -> str:
-        per_person = int(math.ceil(split.grand_total / split.people))
+        per_person = (split.grand_total + split.people - 1) // split.people
         lines = [
             "Mode patungan aktif",
             f"Subtotal: {format_idr(split.subtotal)}",
@@ -274,7 +276,9 @@ class ExpenseService:
         alerts: list[str] = []
 
         weekly_budget = self.db.get_weekly_budget(user_key)
-        total_week = self.db.total_for_period(user_key, "week")
+        total_week, category_total = self.db.totals_with_category_for_period(
+            user_key, "week", category
+        )
         if weekly_budget > 0:
             ratio = total_week / weekly_budget
             if ratio >= 1:
@@ -291,7 +295,6 @@ class ExpenseService:
         category_budget = self.db.get_category_budget(user_key, category)
         if category_budget is None:
             category_budget = self._default_category_budget(weekly_budget)
-        category_total = self.db.total_by_category_for_period(user_key, "week", category)
         if category_budget > 0:
             ratio = category_total / category_budget
             if ratio >= 1:
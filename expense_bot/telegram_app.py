@@ -1,11 +1,19 @@
 from __future__ import annotations
 
 import logging
+import re
 from datetime import datetime
-from io import BytesIO
-
-from telegram import InputFile, Update
-from telegram.ext import Application, CommandHandler, ContextTypes, MessageHandler, filters
+from typing import Awaitable, Callable, Sequence
+
+from telegram import InputFile, Message, PhotoSize, Update
+from telegram.ext import (
+    AIORateLimiter,
+    Application,
+    CommandHandler,
+    ContextTypes,
+    MessageHandler,
+    filters,
+)
 
 from .config import get_settings
 from .charts import ExpenseChartService
@@ -17,6 +25,32 @@ from .service import ExpenseService
 
 logger = logging.getLogger(__name__)
 
+BUDGET_COMMAND_PREFIX = "/budget"
+MAX_RECEIPT_PHOTO_EDGE = 1600
+CONFIRM_TOKENS = frozenset({"simpan", "ya", "y", "oke", "ok"})
+CANCEL_TOKENS = frozenset({"batal", "tidak", "ga", "gak"})
+PENDING_COMMAND_HEAD_LENGTH = max(map(len, CONFIRM_TOKENS | CANCEL_TOKENS)) + 1
+UBAH_COMMAND_RE = re.compile(r"(?is)ubah\s+(total|kategori|merchant|tanggal)\b\s*:?\s*(.*)")
+
+CHART_FAILED_REPLY = "Grafiknya belum berhasil dibuat. Coba lagi sebentar ya."
+OCR_DISABLED_REPLY = "Fitur scan struk belum aktif. Isi `FLORENCE_ENDPOINT_URL` dulu ya."
+OCR_FAILED_REPLY = (
+    "Maaf, scan struknya belum berhasil sekarang. Coba foto lebih terang atau kirim ulang ya."
+)
+OCR_UNREADABLE_REPLY = "Aku belum bisa baca struknya sekarang. Coba kirim foto yang lebih jelas ya."
+UBAH_FORMAT_REPLIES = {
+    "total": "Format ubah total: `ubah total 125000`",
+    "kategori": "Format ubah kategori: `ubah kategori Makanan & Minuman`",
+    "merchant": "Format ubah merchant: `ubah merchant Nama Toko`",
+    "tanggal": "Format ubah tanggal: `ubah tanggal 13/02/2026`",
+}
+PENDING_CANCELLED_REPLY = "Oke, struknya tidak jadi disimpan."
+PENDING_HELP_REPLY = (
+    "Balas `simpan` untuk simpan struk, `batal` untuk batal, "
+    "atau `ubah total/kategori/merchant/tanggal ...`."
+)
+UNAUTHORIZED_REPLY = "Maaf, kamu tidak memiliki akses untuk menggunakan bot ini."
+
 
 def create_telegram_application(
     token: str,
@@ -24,15 +58,14 @@ def create_telegram_application(
     receipt_ocr: ReceiptOCR,
     chart_service: ExpenseChartService,
 ) -> Application:
-    application = Application.builder().token(token).updater(None).build()
-
-    async def start_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-        if update.message:
-            await update.message.reply_text(service.help_text())
+    application = (
+        Application.builder().token(token).updater(None).rate_limiter(AIORateLimiter()).build()
+    )
+    help_text = service.help_text()
 
     async def help_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         if update.message:
-            await update.message.reply_text(service.help_text())
+            await update.message.reply_text(help_text)
 
     async def total_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         if not update.message:
@@ -49,20 +82,15 @@ def create_telegram_application(
             return
         await update.message.reply_text(service.render_summary(_user_key(update)))
 
-    async def total_hari_ini_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-        if not update.message:
-            return
-        await _reply_chunks(update.message, service.render_period_report(_user_key(update), "today"))
-
-    async def total_minggu_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-        if not update.message:
-            return
-        await _reply_chunks(update.message, service.render_period_report(_user_key(update), "week"))
+    def period_report_handler(
+        period: str,
+    ) -> Callable[[Update, ContextTypes.DEFAULT_TYPE], Awaitable[None]]:
+        async def handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+            if not update.message:
+                return
+            await _reply_chunks(update.message, service.render_period_report(_user_key(update), period))
 
-    async def total_bulan_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-        if not update.message:
-            return
-        await _reply_chunks(update.message, service.render_period_report(_user_key(update), "month"))
+        return handler
 
     async def list_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         if not update.message:
@@ -72,69 +100,64 @@ def create_telegram_application(
             limit = max(1, min(50, int(context.args[0])))
         await _reply_chunks(update.message, service.render_recent_list(_user_key(update), limit=limit))
 
-    async def hapus_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-        if not update.message:
-            return
-        await update.message.reply_text(service.reply_delete(_user_key(update), context.args))
+    def args_reply_handler(
+        reply: Callable[[str, list[str]], str],
+    ) -> Callable[[Update, ContextTypes.DEFAULT_TYPE], Awaitable[None]]:
+        async def handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+            if not update.message:
+                return
+            await update.message.reply_text(reply(_user_key(update), context.args))
 
-    async def reset_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-        if not update.message:
-            return
-        await update.message.reply_text(service.reply_reset(_user_key(update), context.args))
+        return handler
 
     async def budget_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         if not update.message:
             return
-        raw_text = _build_command_text("budget", context.args)
+        raw_text = _build_command_text(BUDGET_COMMAND_PREFIX, context.args)
         await update.message.reply_text(service.reply_budget(_user_key(update), raw_text, context.args))
 
     async def grafik_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         if not update.message:
             return
+        now = datetime.now(chart_service.tz)
         try:
-            chart_bytes = await chart_service.render_monthly_category_chart(_user_key(update))
+            chart_bytes = await chart_service.render_monthly_category_chart(_user_key(update), now)
         except Exception:
             logger.exception("Gagal membuat grafik pengeluaran")
-            await update.message.reply_text("Grafiknya belum berhasil dibuat. Coba lagi sebentar ya.")
+            await update.message.reply_text(CHART_FAILED_REPLY)
             return
 
         await update.message.reply_document(
-            document=InputFile(BytesIO(chart_bytes), filename=chart_service.build_filename()),
+            document=InputFile(chart_bytes, filename=chart_service.build_filename(now)),
             caption="Grafik pengeluaran bulan ini.",
         )
 
     async def photo_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-        if not update.message or not update.message.photo:
+        message = update.message
+        if not message or not message.photo:
             return
 
         if not receipt_ocr.enabled:
-            await update.message.reply_text(
-                "Fitur scan struk belum aktif. Isi `FLORENCE_ENDPOINT_URL` dulu ya."
-            )
+            await message.reply_text(OCR_DISABLED_REPLY)
             return
 
-        largest_photo = update.message.photo[-1]
-        tg_file = await largest_photo.get_file()
-        buffer = BytesIO()
-        await tg_file.download_to_memory(out=buffer)
+        receipt_photo = _pick_receipt_photo(message.photo)
+        tg_file = await receipt_photo.get_file()
+        image_bytes = await tg_file.download_as_bytearray()
 
         try:
-            result = await receipt_ocr.scan_receipt(buffer.getvalue())
+            result = await receipt_ocr.scan_receipt(image_bytes)
         except Exception:
             logger.exception("Gagal memproses gambar struk")
-            await update.message.reply_text(
-                "Maaf, scan struknya belum berhasil sekarang. Coba foto lebih terang atau kirim ulang ya."
-            )
+            await message.reply_text(OCR_FAILED_REPLY)
             return
 
         if not result:
-            await update.message.reply_text(
-                "Aku belum bisa baca struknya sekarang. Coba kirim foto yang lebih jelas ya."
-            )
+            await message.reply_text(OCR_UNREADABLE_REPLY)
             return
 
         if result.needs_manual_total_confirmation or not result.receipt:
-            await update.message.reply_text(result.reply_text)
+            await message.reply_text(result.reply_text)
             return
 
         receipt = result.receipt
@@ -149,7 +172,62 @@ def create_telegram_application(
                 is_bank_transaction=receipt.is_bank_transaction,
             )
         )
-        await update.message.reply_text(result.reply_text)
+        await message.reply_text(result.reply_text)
+
+    async def ubah_total_handler(message: Message, pending: PendingReceipt, value: str) -> None:
+        new_amount = parse_amount_from_text(value)
+        if not new_amount or new_amount <= 0:
+            await message.reply_text(UBAH_FORMAT_REPLIES["total"])
+            return
+        pending.amount = new_amount
+        pending.raw_payload["total"] = new_amount
+        service.update_pending_receipt(pending)
+        await message.reply_text(
+            f"Siap, total diubah jadi {format_idr(new_amount)}. Balas `simpan` atau lanjut ubah."
+        )
+
+    async def ubah_kategori_handler(message: Message, pending: PendingReceipt, new_category: str) -> None:
+        if not new_category:
+            await message.reply_text(UBAH_FORMAT_REPLIES["kategori"])
+            return
+        pending.category = new_category
+        pending.raw_payload["kategori"] = new_category
+        service.update_pending_receipt(pending)
+        await message.reply_text(
+            f"Siap, kategori diubah jadi {new_category}. Balas `simpan` atau lanjut ubah."
+        )
+
+    async def ubah_merchant_handler(message: Message, pending: PendingReceipt, new_merchant: str) -> None:
+        if not new_merchant:
+            await message.reply_text(UBAH_FORMAT_REPLIES["merchant"])
+            return
+        pending.item = (
+            f"Transfer ke {new_merchant}" if pending.is_bank_transaction else f"Belanja {new_merchant}"
+        )
+        pending.raw_payload["item"] = pending.item
+        service.update_pending_receipt(pending)
+        await message.reply_text(
+            f"Siap, item diubah jadi {pending.item}. Balas `simpan` atau lanjut ubah."
+        )
+
+    async def ubah_tanggal_handler(message: Message, pending: PendingReceipt, value: str) -> None:
+        new_date = parse_date_input(value)
+        if not new_date:
+            await message.reply_text(UBAH_FORMAT_REPLIES["tanggal"])
+            return
+        pending.expense_date = new_date
+        pending.raw_payload["tanggal"] = format_date_id(new_date)
+        service.update_pending_receipt(pending)
+        await message.reply_text(
+            f"Siap, tanggal diubah jadi {format_date_id(new_date)}. Balas `simpan` atau lanjut ubah."
+        )
+
+    ubah_handlers = {
+        "total": ubah_total_handler,
+        "kategori": ubah_kategori_handler,
+        "merchant": ubah_merchant_handler,
+        "tanggal": ubah_tanggal_handler,
+    }
 
     async def text_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         if not update.message or not update.message.text:
@@ -161,10 +239,10 @@ def create_telegram_application(
             text = text[:100]
             
         pending = service.get_pending_receipt(user_key)
-        low = text.lower()
 
         if pending:
-            if low in {"simpan", "ya", "y", "oke", "ok"}:
+            head = text[:PENDING_COMMAND_HEAD_LENGTH].lower()
+            if head in CONFIRM_TOKENS:
                 response = service.record_expense(
                     user_key=user_key,
                     item=pending.item,
@@ -175,65 +253,16 @@ def create_telegram_application(
                 service.clear_pending_receipt(user_key)
                 await update.message.reply_text(response)
                 return
-            if low.startswith("ubah total"):
-                new_amount = parse_amount_from_text(text)
-                if not new_amount or new_amount <= 0:
-                    await update.message.reply_text("Format ubah total: `ubah total 125000`")
-                    return
-                pending.amount = new_amount
-                pending.raw_payload["total"] = new_amount
-                service.update_pending_receipt(pending)
-                await update.message.reply_text(
-                    f"Siap, total diubah jadi {format_idr(new_amount)}. Balas `simpan` atau lanjut ubah."
-                )
-                return
-            if low.startswith("ubah kategori"):
-                new_category = text[len("ubah kategori") :].strip()
-                if not new_category:
-                    await update.message.reply_text("Format ubah kategori: `ubah kategori Makanan & Minuman`")
-                    return
-                pending.category = new_category
-                pending.raw_payload["kategori"] = new_category
-                service.update_pending_receipt(pending)
-                await update.message.reply_text(
-                    f"Siap, kategori diubah jadi {new_category}. Balas `simpan` atau lanjut ubah."
-                )
-                return
-            if low.startswith("ubah merchant"):
-                new_merchant = text[len("ubah merchant") :].strip()
-                if not new_merchant:
-                    await update.message.reply_text("Format ubah merchant: `ubah merchant Nama Toko`")
-                    return
-                pending.item = (
-                    f"Transfer ke {new_merchant}" if pending.is_bank_transaction else f"Belanja {new_merchant}"
-                )
-                pending.raw_payload["item"] = pending.item
-                service.update_pending_receipt(pending)
-                await update.message.reply_text(
-                    f"Siap, item diubah jadi {pending.item}. Balas `simpan` atau lanjut ubah."
-                )
+            ubah_match = UBAH_COMMAND_RE.match(text)
+            if ubah_match:
+                field, value = ubah_match.groups()
+                await ubah_handlers[field.lower()](update.message, pending, value)
                 return
-            if low.startswith("ubah tanggal"):
-                new_date_text = text[len("ubah tanggal") :].strip()
-                new_date = parse_date_input(new_date_text)
-                if not new_date:
-                    await update.message.reply_text("Format ubah tanggal: `ubah tanggal 13/02/2026`")
-                    return
-                pending.expense_date = new_date
-                pending.raw_payload["tanggal"] = format_date_id(new_date)
-                service.update_pending_receipt(pending)
-                await update.message.reply_text(
-                    f"Siap, tanggal diubah jadi {format_date_id(new_date)}. Balas `simpan` atau lanjut ubah."
-                )
-                return
-            if low in {"batal", "tidak", "ga", "gak"}:
+            if head in CANCEL_TOKENS:
                 service.clear_pending_receipt(user_key)
-                await update.message.reply_text("Oke, struknya tidak jadi disimpan.")
+                await update.message.reply_text(PENDING_CANCELLED_REPLY)
                 return
-            await update.message.reply_text(
-                "Balas `simpan` untuk simpan struk, `batal` untuk batal, "
-                "atau `ubah total/kategori/merchant/tanggal ...`."
-            )
+            await update.message.reply_text(PENDING_HELP_REPLY)
             return
 
         response = service.handle_text(user_key, text)
@@ -248,24 +277,25 @@ def create_telegram_application(
         allowed_users = get_settings().allowed_telegram_users
         if allowed_users and update.effective_user.id not in allowed_users:
             if update.message:
-                await update.message.reply_text("Maaf, kamu tidak memiliki akses untuk menggunakan bot ini.")
+                await update.message.reply_text(UNAUTHORIZED_REPLY)
             raise context.application.stop_propagation()
 
     application.add_handler(MessageHandler(filters.ALL, auth_middleware_handler), group=-1)
 
-    application.add_handler(CommandHandler("start", start_handler))
-    application.add_handler(CommandHandler("help", help_handler))
+    application.add_handler(CommandHandler(["start", "help"], help_handler))
     application.add_handler(CommandHandler("total", total_handler))
-    application.add_handler(CommandHandler("total_hari_ini", total_hari_ini_handler))
-    application.add_handler(CommandHandler("total_minggu", total_minggu_handler))
-    application.add_handler(CommandHandler("total_bulan", total_bulan_handler))
+    application.add_handler(CommandHandler("total_hari_ini", period_report_handler("today")))
+    application.add_handler(CommandHandler("total_minggu", period_report_handler("week")))
+    application.add_handler(CommandHandler("total_bulan", period_report_handler("month")))
     application.add_handler(CommandHandler("list", list_handler))
-    application.add_handler(CommandHandler("hapus", hapus_handler))
-    application.add_handler(CommandHandler("reset", reset_handler))
+    application.add_handler(CommandHandler("hapus", args_reply_handler(service.reply_delete)))
+    application.add_handler(CommandHandler("reset", args_reply_handler(service.reply_reset)))
     application.add_handler(CommandHandler("budget", budget_handler))
     application.add_handler(CommandHandler("grafik", grafik_handler))
-    application.add_handler(MessageHandler(filters.PHOTO, photo_handler))
-    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, text_handler))
+    application.add_handler(MessageHandler(filters.UpdateType.MESSAGE & filters.PHOTO, photo_handler))
+    application.add_handler(
+        MessageHandler(filters.UpdateType.MESSAGE & filters.TEXT & ~filters.COMMAND, text_handler)
+    )
     application.add_error_handler(error_handler)
     return application
 
@@ -275,8 +305,15 @@ def _user_key(update: Update) -> str:
     return f"tg:{user.id}" if user else "tg:unknown"
 
 
-def _build_command_text(command: str, args: list[str]) -> str:
-    return f"/{command} {' '.join(args)}".strip()
+def _pick_receipt_photo(photos: Sequence[PhotoSize]) -> PhotoSize:
+    fitting = [photo for photo in photos if max(photo.width, photo.height) <= MAX_RECEIPT_PHOTO_EDGE]
+    return max(fitting or photos, key=lambda photo: photo.width * photo.height)
+
+
+def _build_command_text(prefix: str, args: list[str]) -> str:
+    if not args:
+        return prefix
+    return f"{prefix} {' '.join(args)}"
 
 
 async def _reply_chunks(message, chunks: list[str]) -> None:
@@ -0,0 +1,21 @@
+from expense_bot.ocr import _extract_total
+
+
+def test_extract_total_keeps_scanning_after_cut_keyword_segment():
+    lines = ["Transfer Amount Rp100.000 Admin Fee Rp6.500 Total Debit Rp106.500"]
+    assert _extract_total(lines, is_bank_transaction=True) == (106500, False)
+
+
+def test_extract_total_skips_keyword_whose_segment_is_cut_empty():
+    lines = ["Nominal Fee Rp 2.500 Total Debit Rp 52.500", "Ref 123456"]
+    assert _extract_total(lines, is_bank_transaction=True) == (52500, False)
+
+
+def test_extract_total_prefers_final_total_over_pre_discount_amount():
+    lines = ["Jumlah 45.500", "Diskon 5.000", "Total Bayar 40.500", "Tunai 50.000"]
+    assert _extract_total(lines, is_bank_transaction=False) == (40500, False)
+
+
+def test_extract_total_prefers_grand_total_over_earlier_total():
+    lines = ["Total 50.000", "Grand Total 45.000"]
+    assert _extract_total(lines, is_bank_transaction=False) == (45000, False)
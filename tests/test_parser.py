@@ -0,0 +1,12 @@
+from expense_bot.parser import parse_amount_token, parse_split_bill
+
+
+def test_parse_amount_token_reads_suffix_after_dotted_rp_prefix():
+    assert parse_amount_token("rp.25rb") == 25000
+
+
+def test_parse_split_bill_applies_decimal_service_percentage():
+    split = parse_split_bill("patungan total 500.000 5 org service 10.5% ppn 11%")
+    assert split is not None
+    assert split.service_amount == 52500
+    assert split.tax_amount == 60775